@@ -8,10 +8,7 @@ from types import ModuleType
 from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Mapping
 from collections import defaultdict, deque
 
-from graphviz import Digraph
 
-
-ModulePath = Tuple[str, ...]
 ImportFunctionType = Callable[[str, Dict[str, Any], Dict[str, Any], List[str], int], Any]
 
 
@@ -31,56 +28,53 @@ class ImportAction:
         self._fromlist = fromlist
         self._level = level
         self._imported_module = imported_module
+        self._from_name = None  # type: Optional[str]
 
     def from_name(self) -> str:
-        if self._globals is None:
-            return self.UNKNOWN_MODULE_NAME
-        try:
-            return self._globals['__name__']
-        except KeyError:
-            return self.UNKNOWN_MODULE_NAME
+        if self._from_name is None:
+            self._from_name = (self._globals or {}).get('__name__', self.UNKNOWN_MODULE_NAME)
+        return self._from_name
 
-    def _build_imported_paths(self) -> Iterable[ModulePath]:
+    def _build_imported_paths(self) -> Iterable[str]:
         """Fully qualified names for `from ... import ...` imports
 
-        This resolves relative imports and returns one path for every imported item in the fromlist
+        This resolves relative imports and returns one name for every imported item in the fromlist
         """
-        from_module_path = self.from_name().split('.')
-        root_module = from_module_path[:-self._level]
+        if not self._fromlist:
+            return []
+        root_module = self.from_name() if self._level else ''
+        for _ in range(self._level):
+            root_module = root_module.rpartition('.')[0]
         if self._name:
-            root_module += self._name.split('.')
-        return [tuple(root_module + [from_item]) for from_item in self._fromlist]
+            root_module = root_module + '.' + self._name if root_module else self._name
+        if not root_module:
+            return list(self._fromlist)
+        return [root_module + '.' + from_item for from_item in self._fromlist]
 
     @staticmethod
-    def _get_module(name: str):
-        try:
-            return sys.modules[name]
-        except KeyError:
-            return None
+    def _get_module(name: str) -> Optional[ModuleType]:
+        return sys.modules.get(name)
 
     @classmethod
-    def module_file_path(cls, name: str):
+    def module_file_path(cls, name: str) -> str:
         module = cls._get_module(name)
         if module is None:
             return ''
-        try:
-            return module.__file__
-        except AttributeError:
-            return ''
+        return getattr(module, '__file__', None) or ''
 
-    def _last_module_in_path(self, path: ModulePath) -> ModulePath:
-        """Given a path, find the last item that refers to a module object"""
-        for sub_path in (path[:i] for i in reversed(range(len(path) + 1))):
-            if self._get_module('.'.join(sub_path)) is not None:
-                return sub_path
-        return tuple()
+    def _last_module_in_path(self, path: str) -> str:
+        """Given a dotted path, find the longest prefix that refers to a module object"""
+        while path:
+            if self._get_module(path) is not None:
+                return sys.intern(path)
+            path = path.rpartition('.')[0]
+        return ''
 
     def imported_names(self) -> Iterable[str]:
-        if self._fromlist is None:
+        if not self._fromlist:
             return [self._name]
         imported_paths = self._build_imported_paths()
-        imported_module_paths = {self._last_module_in_path(imported_path) for imported_path in imported_paths}
-        return ['.'.join(module_path) for module_path in imported_module_paths]
+        return list({self._last_module_in_path(imported_path) for imported_path in imported_paths})
 
 
 class AbstractImportGraph(metaclass=abc.ABCMeta):
@@ -90,9 +84,9 @@ class AbstractImportGraph(metaclass=abc.ABCMeta):
         else:
             self._filename_regex = None
         exclude_files = exclude_files or []
-        self.nodes = set()  # type: Set[str]
         self._exclude_regexes = [re.compile(exclude_re) for exclude_re in exclude_files]
-        self._edges = set()  # type: Set[Tuple[str, str]]
+        self._file_decision_cache = {}  # type: Dict[str, bool]
+        self.nodes = set()  # type: Set[str]
         self._adjacency_list = defaultdict(set)  # type: Mapping[str, Set[str]]
         self._reverse_adjacency_list = defaultdict(set)  # type: Mapping[str, Set[str]]
         self._node_hierarchy = {}  # type: Mapping[str, int]
@@ -104,71 +98,68 @@ class AbstractImportGraph(metaclass=abc.ABCMeta):
     def importing_modules(self, node: str) -> Optional[Set[str]]:
         return self._reverse_adjacency_list.get(node)
 
-    def _files_match_regex(self, from_name: str, to_name: str) -> bool:
-        if self._filename_regex is None:
-            return True
-        from_match = self._filename_regex.fullmatch(ImportAction.module_file_path(from_name))
-        to_match = self._filename_regex.fullmatch(ImportAction.module_file_path(to_name))
-        return bool(from_match and to_match)
-
-    def _files_are_excluded(self, from_name: str, to_name: str) -> bool:
-        for regex in self._exclude_regexes:
-            if (
-                regex.fullmatch(ImportAction.module_file_path(from_name)) or
-                regex.fullmatch(ImportAction.module_file_path(to_name))
-            ):
-                return True
-        return False
+    def _file_is_kept(self, name: str) -> bool:
+        file_path = ImportAction.module_file_path(name)
+        try:
+            return self._file_decision_cache[file_path]
+        except KeyError:
+            pass
+        is_kept = (
+            (self._filename_regex is None or bool(self._filename_regex.fullmatch(file_path))) and
+            not any(regex.fullmatch(file_path) for regex in self._exclude_regexes)
+        )
+        self._file_decision_cache[file_path] = is_kept
+        return is_kept
 
     def _should_keep_edge(self, from_name: str, to_name: str) -> bool:
-        return self._files_match_regex(from_name, to_name) and not self._files_are_excluded(from_name, to_name)
+        return self._file_is_kept(from_name) and self._file_is_kept(to_name)
 
     def _add_node(self, node: str) -> None:
         if node not in self.nodes:
             self.nodes.add(node)
 
-    def _add_edge(self, edge: Tuple[str, str]) -> None:
-        for node in edge:
-            if node not in self.nodes:
-                self._add_node(node)
-        if edge not in self._edges:
-            tail, head = edge
-            self._edges.add(edge)
-            self._adjacency_list[tail].add(head)
-            self._reverse_adjacency_list[head].add(tail)
+    def add_edge(self, tail: str, head: str) -> None:
+        """Add an edge without applying the filename filters"""
+        if head in self._adjacency_list.get(tail, ()):
+            return
+        # Names are stored in several containers, intern them so all of them share one string object
+        tail, head = sys.intern(tail), sys.intern(head)
+        self._adjacency_list[tail].add(head)
+        self._reverse_adjacency_list[head].add(tail)
+        self.nodes.add(tail)
+        self.nodes.add(head)
 
     def _build_hierarchy(self):
-        self._node_hierarchy = defaultdict(int)
-        root_queue = deque(node for node in self.nodes if not self.importing_modules(node))
-        sub_hierarchies = {node: {node} for node in root_queue}
-        while root_queue:
-            root_node = root_queue.popleft()
-            work_queue = deque([(root_node, 0)])
-            while work_queue:
-                node, level = work_queue.popleft()
-                for other_root, children in sub_hierarchies.items():
-                    if other_root == root_node:
-                        continue
-                    if node in children:
-                        current_node_level = self._node_hierarchy[node]
-                        offset = current_node_level - level
-                        for node in children:
-                            self._node_hierarchy[node] -= offset
-                        del sub_hierarchies[other_root]
-                        break
-                else: # if loop didn't break
-                    self._node_hierarchy[node] = level
-                    work_queue.extend((child, level + 1) for child in self.imported_modules(node))
-                    sub_hierarchies[root_node].add(node)
-        min_level = min(self._node_hierarchy.values())
-        for node in self._node_hierarchy:
-            self._node_hierarchy[node] -= min_level
-    
+        """Assign every node a level one below the deepest module importing it
+
+        Nodes that the topological pass never processes, because they are part of an import cycle or
+        imported from one, are placed at level 0.
+        """
+        in_degrees = {node: len(self._reverse_adjacency_list.get(node, ())) for node in self.nodes}
+        node_hierarchy = {node: 0 for node, in_degree in in_degrees.items() if in_degree == 0}
+        work_queue = deque(node_hierarchy)
+        while work_queue:
+            node = work_queue.popleft()
+            child_level = node_hierarchy[node] + 1
+            for child in self._adjacency_list.get(node, ()):
+                if node_hierarchy.get(child, 0) < child_level:
+                    node_hierarchy[child] = child_level
+                in_degrees[child] -= 1
+                if in_degrees[child] == 0:
+                    work_queue.append(child)
+        for node, in_degree in in_degrees.items():
+            if in_degree:
+                node_hierarchy[node] = 0
+        self._node_hierarchy = node_hierarchy
+
     def add_import(self, import_action: ImportAction) -> None:
+        from_name = import_action.from_name()
+        known_names = self._adjacency_list.get(from_name, ())
         for name in import_action.imported_names():
-            edge = (import_action.from_name(), name)
-            if self._should_keep_edge(*edge):
-                self._add_edge(edge)
+            if name in known_names:
+                continue
+            if self._should_keep_edge(from_name, name):
+                self.add_edge(from_name, name)
 
     @abc.abstractmethod
     def save(self, filename: str) -> None:
@@ -179,32 +170,30 @@ class AbstractImportGraph(metaclass=abc.ABCMeta):
         pass
 
 
-class CouplingGraph:
-    def __init__(self, import_graph: AbstractImportGraph) -> None:
-        self._import_graph = import_graph
-
-
 class DotImportGraph(AbstractImportGraph):
-    def _build_digraph(self):
-        digraph = Digraph(name='Imports', graph_attr={
-            'splines': 'ortho',
-        })
-        for node in self.nodes:
-            digraph.node(node, shape='rectangle')
-        for edge in self._edges:
-            digraph.edge(*edge)
-        return digraph
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"{}"'.format(name.replace('\\', '\\\\').replace('"', '\\"'))
 
     def to_string(self) -> str:
-        return self._build_digraph().source
+        """The DOT source of the graph"""
+        quote = self._quote
+        return ''.join((
+            'digraph Imports {\n',
+            '\tgraph [splines=ortho]\n',
+            '\tnode [shape=rectangle]\n',
+            ''.join('\t{}\n'.format(quote(node)) for node in self.nodes),
+            ''.join(
+                '\t{} -> {}\n'.format(quote(tail), quote(head))
+                for tail, heads in self._adjacency_list.items()
+                for head in heads
+            ),
+            '}\n',
+        ))
 
     def save(self, filename: str) -> None:
-        self._build_digraph().save(filename=filename)
-
-
-class ModuleClusterer(AbstractImportGraph):
-    def __init__(self, import_graph: AbstractImportGraph) -> None:
-        self._import_graph = import_graph
+        with open(filename, 'w', encoding='utf-8') as output_file:
+            output_file.write(self.to_string())
 
 
 class ImportGraphCommand:
@@ -251,8 +240,21 @@ class ImportGraphCommand:
             filename_regex=self._options.regex,
             exclude_files=self._options.exclude,
         )
+        self._seen_imports = set()  # type: Set[Tuple[str, str]]
 
     def _import_wrapper(self, old_import: ImportFunctionType) -> ImportFunctionType:
+        if self._options.regex is None and not self._options.exclude:
+            return self._unfiltered_import_wrapper(old_import)
+        return self._filtered_import_wrapper(old_import)
+
+    def _unfiltered_import_wrapper(self, old_import: ImportFunctionType) -> ImportFunctionType:
+        """An import wrapper for graphs without filename filters
+
+        Without filters every plain import is an edge, so it is added directly without an `ImportAction`.
+        """
+        add_edge = self._import_graph.add_edge
+        add_import = self._import_graph.add_import
+
         def new_import(
             name: str,
             the_globals: Dict[str, Any]=None,
@@ -261,26 +263,52 @@ class ImportGraphCommand:
             level: int=0,
         ) -> ModuleType:
             module = old_import(name, the_globals, the_locals, fromlist, level)
+            if fromlist:
+                add_import(ImportAction(name, the_globals, fromlist, level, module))
+            else:
+                add_edge((the_globals or {}).get('__name__', ImportAction.UNKNOWN_MODULE_NAME), name)
+            return module
+        return new_import
+
+    def _filtered_import_wrapper(self, old_import: ImportFunctionType) -> ImportFunctionType:
+        def new_import(
+            name: str,
+            the_globals: Dict[str, Any]=None,
+            the_locals: Dict[str, Any]=None,
+            fromlist: List[str]=(),
+            level: int=0,
+        ) -> ModuleType:
+            module = old_import(name, the_globals, the_locals, fromlist, level)
+            if not fromlist:
+                import_key = ((the_globals or {}).get('__name__', ImportAction.UNKNOWN_MODULE_NAME), name)
+                if import_key in self._seen_imports:
+                    return module
+                self._seen_imports.add(import_key)
             import_action = ImportAction(name, the_globals, fromlist, level, module)
             self._import_graph.add_import(import_action)
             return module
         return new_import
 
-    def _collect_module_names(self, directory, parents=()):
+    @staticmethod
+    def _raise_walk_error(error: OSError) -> None:
+        raise error
+
+    def _collect_module_names(self, directory):
         modules = []
-        if '__init__.py' not in os.listdir(directory) and parents:
-            return modules
-        for file_name in os.listdir(directory):
-            full_name = os.path.join(directory, file_name)
-            if os.path.isfile(full_name):
-                name, extention = os.path.splitext(file_name)
-                if extention == '.py':
+        for dir_path, dir_names, file_names in os.walk(directory, onerror=self._raise_walk_error, followlinks=True):
+            relative_path = os.path.relpath(dir_path, directory)
+            parents = () if relative_path == os.curdir else tuple(relative_path.split(os.sep))
+            if parents and '__init__.py' not in file_names:
+                dir_names[:] = []
+                continue
+            dir_names[:] = [dir_name for dir_name in dir_names if dir_name != '__pycache__']
+            for file_name in file_names:
+                if file_name.endswith('.py'):
+                    name = file_name[:-3]
                     if name == '__init__' and parents:
                         modules.append('.'.join(parents))
                     else:
                         modules.append('.'.join(parents + (name,)))
-            elif os.path.isdir(full_name) and not file_name == '__pycache__':
-                modules.extend(self._collect_module_names(full_name, parents=parents + (file_name,)))
         return modules
 
     def _module_names(self):
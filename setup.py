@@ -8,5 +8,4 @@ setup(
     py_modules=['importgraph'],
     license='MIT',
     python_requires='>=3',
-    install_requires=['graphviz'],
 )
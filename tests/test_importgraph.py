@@ -1,9 +1,11 @@
+import builtins
+import sys
 from typing import Any, Dict, List, Optional, Set, Tuple
 from unittest.mock import MagicMock
 
 import pytest
 
-from importgraph import ImportAction, ModulePath
+from importgraph import DotImportGraph, ImportAction, ImportGraphCommand
 
 
 class TestImportAction:
@@ -27,15 +29,17 @@ class TestImportAction:
         'name,fromlist,level,expected_result',
         [
             # from . import module2
-            ('', ['module2'], 1, {('some', 'module2')}),
+            ('', ['module2'], 1, {'some.module2'}),
             # from .module2 import SomeClass
-            ('module2', ['SomeClass'], 1, {('some', 'module2', 'SomeClass')}),
+            ('module2', ['SomeClass'], 1, {'some.module2.SomeClass'}),
             # from .. import module
-            ('', ['module'], 2, {('module',)}),
+            ('', ['module'], 2, {'module'}),
             # from some.module1 import SomeClass
-            ('some.module2', ['SomeClass'], 0, {('some', 'module2', 'SomeClass')}),
+            ('some.module2', ['SomeClass'], 0, {'some.module2.SomeClass'}),
             # from . import module2, module3
-            ('', ['module2', 'module3'], 1, {('some', 'module2'), ('some', 'module3')}),
+            ('', ['module2', 'module3'], 1, {'some.module2', 'some.module3'}),
+            # import some.module2
+            ('some.module2', (), 0, set()),
         ],
     )
     def test_build_imported_paths(
@@ -43,7 +47,7 @@ class TestImportAction:
         name: str,
         fromlist: Optional[List[str]],
         level: int,
-        expected_result: Set[ModulePath],
+        expected_result: Set[str],
         import_action: ImportAction,
     ) -> None:
         import_action.from_name = MagicMock(return_value='some.module')
@@ -63,8 +67,183 @@ class TestImportAction:
         import_action: ImportAction,
     ) -> None:
         import_action._get_module = MagicMock()
-        path = ('some', 'module', 'path')
+        path = 'some.module.path'
 
         result = import_action._last_module_in_path(path)
 
         assert result == path
+
+    def test_last_module_in_path_returns_longest_loaded_prefix(
+        self,
+        import_action: ImportAction,
+    ) -> None:
+        import_action._get_module = MagicMock(side_effect=lambda name: MagicMock() if name == 'some.module' else None)
+        path = 'some.module.SomeClass'
+
+        result = import_action._last_module_in_path(path)
+
+        assert result == 'some.module'
+
+
+class TestDotImportGraph:
+
+    @pytest.mark.parametrize(
+        'filename_regex,exclude_files,expected_result',
+        [
+            (None, None, True),
+            ('.*/os.py', None, True),
+            ('.*/re.py', None, False),
+            (None, ['.*/re.py', '.*/os.py'], False),
+            ('.*/os.py', ['.*/re.py'], True),
+            (None, ['(?i).*/OS.PY'], False),
+            (None, ['(?i).*/RE.PY', '.*/OS.PY'], True),
+        ],
+    )
+    def test_should_keep_edge(
+        self,
+        filename_regex: Optional[str],
+        exclude_files: Optional[List[str]],
+        expected_result: bool,
+    ) -> None:
+        import_graph = DotImportGraph(filename_regex=filename_regex, exclude_files=exclude_files)
+
+        result = import_graph._should_keep_edge('os', 'os')
+
+        assert result == expected_result
+
+    @pytest.mark.parametrize(
+        'file_path,exclude_files,expected_result',
+        [
+            ('/lib/OS.py', ['(?i).*/os.py'], False),
+            ('bb', ['(a)\\1', '(b)\\1'], False),
+            ('ab', ['(a)\\1', '(b)\\1'], True),
+        ],
+    )
+    def test_should_keep_edge_exclude_patterns(
+        self,
+        file_path: str,
+        exclude_files: List[str],
+        expected_result: bool,
+        monkeypatch,
+    ) -> None:
+        monkeypatch.setattr(ImportAction, 'module_file_path', MagicMock(return_value=file_path))
+        import_graph = DotImportGraph(exclude_files=exclude_files)
+
+        result = import_graph._should_keep_edge('some.module', 'other.module')
+
+        assert result == expected_result
+
+    @pytest.mark.parametrize(
+        'edges,expected_result',
+        [
+            ([('a', 'b'), ('b', 'c')], {'a': 0, 'b': 1, 'c': 2}),
+            ([('a', 'b'), ('b', 'c'), ('a', 'c')], {'a': 0, 'b': 1, 'c': 2}),
+            ([('a', 'c'), ('b', 'c'), ('d', 'e')], {'a': 0, 'b': 0, 'c': 1, 'd': 0, 'e': 1}),
+            ([('a', 'b'), ('b', 'c'), ('c', 'b')], {'a': 0, 'b': 0, 'c': 0}),
+            ([('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('a', 'e')], {'a': 0, 'b': 0, 'c': 0, 'd': 0, 'e': 1}),
+        ],
+    )
+    def test_build_hierarchy(self, edges: List[Tuple[str, str]], expected_result: Dict[str, int]) -> None:
+        import_graph = DotImportGraph()
+        for edge in edges:
+            import_graph.add_edge(*edge)
+
+        import_graph._build_hierarchy()
+
+        assert import_graph._node_hierarchy == expected_result
+
+    def test_to_string(self) -> None:
+        import_graph = DotImportGraph()
+        import_graph.add_edge('some.module', 'quoted"module')
+
+        lines = import_graph.to_string().splitlines()
+
+        assert lines[:3] == ['digraph Imports {', '\tgraph [splines=ortho]', '\tnode [shape=rectangle]']
+        assert lines[-1] == '}'
+        assert set(lines[3:-1]) == {
+            '\t"some.module"',
+            '\t"quoted\\"module"',
+            '\t"some.module" -> "quoted\\"module"',
+        }
+
+    def test_save_writes_utf8(self, tmp_path) -> None:
+        import_graph = DotImportGraph()
+        import_graph.add_edge('módulo', 'モジュール')
+        file_path = tmp_path / 'graph.dot'
+
+        import_graph.save(str(file_path))
+
+        assert file_path.read_text(encoding='utf-8') == import_graph.to_string()
+
+
+class TestImportGraphCommand:
+
+    def test_collect_module_names(self, tmp_path) -> None:
+        for file_name in [
+            'top.py',
+            'readme.txt',
+            'package/__init__.py',
+            'package/module.py',
+            'package/sub/__init__.py',
+            'package/sub/module.py',
+            'package/__pycache__/cached.py',
+            'not_a_package/module.py',
+        ]:
+            file_path = tmp_path.joinpath(*file_name.split('/'))
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.touch()
+        command = ImportGraphCommand(['-d', str(tmp_path)])
+
+        module_names = command._collect_module_names(str(tmp_path))
+
+        assert sorted(module_names) == ['package', 'package.module', 'package.sub', 'package.sub.module', 'top']
+
+    def test_collect_module_names_missing_directory(self, tmp_path) -> None:
+        directory = str(tmp_path / 'missing')
+        command = ImportGraphCommand(['-d', directory])
+
+        with pytest.raises(FileNotFoundError):
+            command._collect_module_names(directory)
+
+    @pytest.mark.parametrize(
+        'args',
+        [
+            [],
+            ['-x', '.*/not_a_match.py'],
+        ],
+    )
+    def test_import_wrapper_records_edges(self, args: List[str], tmp_path, monkeypatch) -> None:
+        package_files = {
+            '__init__.py': 'from hook_test_package import first, second\n',
+            'first.py': 'import os.path\nimport os.path\nfrom . import second\nfrom .second import VALUE\n',
+            'second.py': 'import json\nVALUE = 1\n',
+        }
+        package_path = tmp_path / 'hook_test_package'
+        package_path.mkdir()
+        for file_name, source in package_files.items():
+            (package_path / file_name).write_text(source)
+        monkeypatch.syspath_prepend(str(tmp_path))
+        command = ImportGraphCommand(['hook_test_package'] + args)
+
+        old_import = builtins.__import__
+        monkeypatch.setattr(builtins, '__import__', command._import_wrapper(old_import))
+        try:
+            __import__('hook_test_package')
+        finally:
+            monkeypatch.setattr(builtins, '__import__', old_import)
+            for module_name in ['hook_test_package', 'hook_test_package.first', 'hook_test_package.second']:
+                sys.modules.pop(module_name, None)
+
+        package_edges = {
+            (tail, head)
+            for tail, heads in command._import_graph._adjacency_list.items()
+            if tail.startswith('hook_test_package')
+            for head in heads
+        }
+        assert package_edges == {
+            ('hook_test_package', 'hook_test_package.first'),
+            ('hook_test_package', 'hook_test_package.second'),
+            ('hook_test_package.first', 'os.path'),
+            ('hook_test_package.first', 'hook_test_package.second'),
+            ('hook_test_package.second', 'json'),
+        }